@@ -9,17 +9,313 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import (
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException
+)
 from supabase import create_client, Client
 from dotenv import load_dotenv
-import time
-import json
+from selectolax.parser import HTMLParser, Node
+import requests
+import atexit
+import logging
+import orjson
 import os
+import sys
+import time
 from datetime import datetime
+from typing import Optional
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
 
 # Load environment variables from .env file
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
+# LinkedIn guest jobs API, which returns the search results as HTML job cards
+GUEST_JOBS_API_URL = "https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search"
+GUEST_JOBS_PARAMS = {
+    "keywords": "data",
+    "location": "casablanca",
+    "distance": "100",
+    "f_TPR": "r86400"
+}
+GUEST_JOBS_PAGE_SIZE = 25
+GUEST_JOBS_MAX_PAGES = 40
+GUEST_JOBS_PAGE_DELAY = 0.5  # Seconds between page requests
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Selectors used on the search results page
+SEL_JOBS_LIST = (By.CSS_SELECTOR, "#main-content > section.two-pane-serp-page__results-list > ul")
+SEL_SIGN_IN_MODAL = (By.CSS_SELECTOR, "#base-contextual-sign-in-modal")
+SEL_SIGN_IN_MODAL_CLOSE = (By.CSS_SELECTOR, "#base-contextual-sign-in-modal > div > section > button")
+
+# Selectors for the fields of a single job card
+JOB_CARD_SELECTORS = {
+    "logo": ".search-entity-media img",
+    "title": ".base-search-card__title",
+    "company": ".base-search-card__subtitle a",
+    "location": ".job-search-card__location",
+    "url": "a.base-card__full-link"
+}
+
+# Default values for a scraped job, copied for every job card
+_JOB_TEMPLATE = {
+    "logo": "-",
+    "title": "-",
+    # The description is not visible in the list view
+    "description": "Job description not available in list view",
+    "company": "-",
+    "location": "-",
+    "url": "-"
+}
+
+# Extracts the fields of every job card in the results list in one call,
+# instead of one WebDriver round-trip per field and card.
+# Called with the jobs list selector and JOB_CARD_SELECTORS as arguments.
+EXTRACT_JOBS_JS = """
+const [listSelector, selectors] = arguments;
+const items = document.querySelectorAll(listSelector + " > li");
+const text = (card, selector) => {
+    const el = card.querySelector(selector);
+    return el ? el.innerText.trim() : null;
+};
+const results = [];
+for (const item of items) {
+    const card = item.querySelector("div");
+    if (!card) continue;
+    const logo = card.querySelector(selectors.logo);
+    const link = card.querySelector(selectors.url);
+    results.push({
+        logo: logo ? logo.src : null,
+        title: text(card, selectors.title),
+        company: text(card, selectors.company),
+        location: text(card, selectors.location),
+        url: link ? link.href.trim() : null
+    });
+}
+return results;
+"""
+
+# Counts the job cards currently in the results list
+COUNT_JOB_CARDS_JS = "return document.querySelectorAll(arguments[0] + ' > li').length;"
+
+# Upper bound on scroll rounds when lazy-loading more job cards
+MAX_SCROLL_ROUNDS = 40
+
+# Chrome driver shared across invocations, created lazily by _get_driver()
+_driver = None
+
+
+def _get_chromedriver_path() -> Optional[str]:
+    """
+    Return the pinned ChromeDriver path, or None to let Selenium Manager resolve it
+    
+    Set CHROMEDRIVER_PATH to pin the driver and skip driver resolution entirely.
+    Otherwise Selenium's built-in Selenium Manager finds a driver matching the
+    installed Chrome and caches it under ~/.cache/selenium.
+    """
+    return os.getenv("CHROMEDRIVER_PATH") or None
+
+
+def _get_driver() -> webdriver.Chrome:
+    """Return the shared Chrome driver, starting the browser on first use"""
+    global _driver
+    if _driver is not None:
+        return _driver
+    
+    # Chrome options
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    # Record DevTools network events so _wait_for_network_idle() can read them
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    
+    # Block content the scraper never reads to cut page-load bytes: only src
+    # attributes and text are read from the DOM, so images and fonts never need to load
+    prefs = {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.fonts": 2
+    }
+    chrome_options.add_experimental_option("prefs", prefs)
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-notifications")
+    chrome_options.add_argument("--disable-background-networking")
+    chrome_options.add_argument("--disable-sync")
+    
+    service = Service(_get_chromedriver_path())
+    _driver = webdriver.Chrome(service=service, options=chrome_options)
+    atexit.register(_driver.quit)
+    return _driver
+
+
+def _parse_job_card(card: Node) -> dict:
+    """Extract the job fields from a guest API job card"""
+    fields = {}
+    for field in ("title", "company", "location"):
+        node = card.css_first(JOB_CARD_SELECTORS[field])
+        fields[field] = node.text(strip=True) if node else None
+    
+    # Logos are lazy-loaded, the real URL is kept in data-delayed-url
+    logo = card.css_first(JOB_CARD_SELECTORS["logo"])
+    fields["logo"] = (logo.attributes.get("data-delayed-url") or logo.attributes.get("src")) if logo else None
+    
+    link = card.css_first(JOB_CARD_SELECTORS["url"])
+    href = link.attributes.get("href") if link else None
+    fields["url"] = href.strip() if href else None
+    return fields
+
+
+def _job_key(card: Node, job: dict) -> tuple:
+    """
+    Return a key identifying the job behind a guest API card
+    
+    Card links carry per-result tracking parameters (position, pageNum, refId,
+    trackingId), so the same job has a different href on every page. Use the
+    job posting URN when present, then the link without its query string.
+    """
+    urn = card.attributes.get("data-entity-urn")
+    if urn:
+        return ("urn", urn)
+    if job["url"]:
+        return ("url", urlsplit(job["url"])._replace(query="", fragment="").geturl())
+    return ("fields", job["title"], job["company"], job["location"])
+
+
+def _fetch_jobs_from_guest_api() -> list:
+    """Fetch the job cards from LinkedIn's guest jobs API, one page of 25 at a time"""
+    print("Fetching jobs from LinkedIn guest jobs API...")
+    raw_jobs = []
+    seen = set()
+    
+    with requests.Session() as session:
+        session.headers.update({"User-Agent": USER_AGENT})
+        
+        for page in range(GUEST_JOBS_MAX_PAGES):
+            if page:
+                time.sleep(GUEST_JOBS_PAGE_DELAY)  # Be gentle with the guest API
+            
+            try:
+                response = session.get(GUEST_JOBS_API_URL, params={**GUEST_JOBS_PARAMS, "start": page * GUEST_JOBS_PAGE_SIZE}, timeout=10)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                # Keep the pages already fetched if a later one fails
+                if not raw_jobs:
+                    raise
+                print(f"Guest jobs API failed on page {page + 1}, keeping {len(raw_jobs)} jobs already fetched: {e}")
+                break
+            
+            new_jobs = 0
+            for card in HTMLParser(response.text).css(".base-card"):
+                job = _parse_job_card(card)
+                
+                # LinkedIn repeats cards across pages, and past the last page it may keep
+                # returning the same one, so dedupe on the job id
+                key = _job_key(card, job)
+                if key not in seen:
+                    seen.add(key)
+                    raw_jobs.append(job)
+                    new_jobs += 1
+            
+            # Stop at the first page that is empty or adds no new jobs
+            if not new_jobs:
+                break
+    
+    return raw_jobs
+
+
+def _wait_for_network_idle(driver: webdriver.Chrome, idle_time: float = 0.5, timeout: float = 10) -> bool:
+    """
+    Wait until every request seen in the DevTools network events has finished
+    and no new one has started for idle_time seconds
+    
+    Returns:
+        True once the network is idle, False if timeout expires first
+    """
+    pending = set()
+    idle_since = None
+    
+    def network_idle(driver: webdriver.Chrome) -> bool:
+        nonlocal idle_since
+        for entry in driver.get_log("performance"):
+            message = orjson.loads(entry["message"])["message"]
+            method = message["method"]
+            if method == "Network.requestWillBeSent":
+                pending.add(message["params"]["requestId"])
+                idle_since = None
+            elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+                pending.discard(message["params"]["requestId"])
+        
+        if pending:
+            idle_since = None
+            return False
+        
+        now = time.monotonic()
+        if idle_since is None:
+            idle_since = now
+        return now - idle_since >= idle_time
+    
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=0.05).until(network_idle)
+    except TimeoutException:
+        return False
+
+
+def _fetch_jobs_with_selenium() -> list:
+    """Fetch the job cards by loading the search page in Chrome"""
+    # LinkedIn jobs search URL
+    url = "https://www.linkedin.com/jobs/search/?currentJobId=4318630051&distance=100&f_TPR=r86400&keywords=data&location=casablanca&origin=JOB_SEARCH_PAGE_JOB_FILTER&trk=jobs_jserp_facet_geo_city"
+    
+    # Reuse the Chrome driver across invocations
+    driver = _get_driver()
+    wait = WebDriverWait(driver, 10)
+    
+    # Navigate to the LinkedIn jobs page
+    print("Opening LinkedIn jobs search page...")
+    driver.get(url)
+    
+    # Wait for jobs list to load
+    print("Waiting for jobs list to load...")
+    wait.until(EC.presence_of_element_located(SEL_JOBS_LIST))
+    
+    # Try to close the sign-in modal if it appears
+    try:
+        print("Attempting to close sign-in modal...")
+        close_button = driver.find_element(*SEL_SIGN_IN_MODAL_CLOSE)
+        close_button.click()
+        WebDriverWait(driver, 5).until(EC.invisibility_of_element_located(SEL_SIGN_IN_MODAL))
+        print("Sign-in modal closed successfully!")
+    except (NoSuchElementException, ElementNotInteractableException, ElementClickInterceptedException, StaleElementReferenceException, TimeoutException) as e:
+        print(f"Sign-in modal not found or already closed: {e}")
+    
+    # Scroll until LinkedIn stops lazy-loading more job cards
+    print("Scrolling to load more jobs...")
+    driver.execute_cdp_cmd("Network.enable", {})
+    card_count = 0
+    for _ in range(MAX_SCROLL_ROUNDS):
+        previous_count = card_count
+        card_count = driver.execute_script(COUNT_JOB_CARDS_JS, SEL_JOBS_LIST[1])
+        if card_count == previous_count:
+            break
+        
+        driver.get_log("performance")  # Drop events from before the scroll
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight)")
+        _wait_for_network_idle(driver)
+    
+    # Extract every job card in a single round-trip to the browser
+    return driver.execute_script(EXTRACT_JOBS_JS, SEL_JOBS_LIST[1], JOB_CARD_SELECTORS)
+
+
 def scrape_linkedin_jobs():
     """
     Scrapes LinkedIn jobs data and saves to JSON and database
@@ -36,150 +332,78 @@ def scrape_linkedin_jobs():
         supabase: Client = create_client(supabase_url, supabase_key)
         print("Supabase client initialized successfully.")
     
-    # LinkedIn jobs search URL
-    url = "https://www.linkedin.com/jobs/search/?currentJobId=4318630051&distance=100&f_TPR=r86400&keywords=data&location=casablanca&origin=JOB_SEARCH_PAGE_JOB_FILTER&trk=jobs_jserp_facet_geo_city"
-    
-    # Chrome options
-    chrome_options = Options()
-    chrome_options.add_argument("--start-maximized")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    
     try:
-        # Setup Chrome driver
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        wait = WebDriverWait(driver, 10)
-        
-        # Navigate to the LinkedIn jobs page
-        print("Opening LinkedIn jobs search page...")
-        driver.get(url)
-        
-        # Wait for page to load
-        time.sleep(5)
-        
-        # Try to close the sign-in modal if it appears
+        # Fetch the job cards from the guest jobs API, falling back to a
+        # full browser session if it fails or returns nothing
         try:
-            print("Attempting to close sign-in modal...")
-            close_button = driver.find_element(By.CSS_SELECTOR, "#base-contextual-sign-in-modal > div > section > button")
-            close_button.click()
-            print("Sign-in modal closed successfully!")
-            time.sleep(2)
+            raw_jobs = _fetch_jobs_from_guest_api()
         except Exception as e:
-            print(f"Sign-in modal not found or already closed: {e}")
+            print(f"Guest jobs API failed: {e}")
+            raw_jobs = []
         
-        # Wait for jobs list to load
-        print("Waiting for jobs list to load...")
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#main-content > section.two-pane-serp-page__results-list > ul")))
+        if not raw_jobs:
+            print("Falling back to Selenium...")
+            raw_jobs = _fetch_jobs_with_selenium()
         
-        # Find all job items
-        jobs_list = driver.find_element(By.CSS_SELECTOR, "#main-content > section.two-pane-serp-page__results-list > ul")
-        job_items = jobs_list.find_elements(By.CSS_SELECTOR, "li")
-        
-        print(f"Found {len(job_items)} job listings")
+        print(f"Found {len(raw_jobs)} job listings")
         
         scraped_jobs = []
         
-        for i, job_item in enumerate(job_items):
-            try:
-                print(f"Scraping job {i+1}/{len(job_items)}...")
-                
-                # Initialize job data with default values
-                job_data = {
-                    "logo": "-",
-                    "title": "-",
-                    "description": "-",
-                    "company": "-",
-                    "location": "-",
-                    "url": "-"
-                }
-                
-                # Extract job card element
-                job_card = job_item.find_element(By.CSS_SELECTOR, "div")
-                
-                # Extract logo
-                try:
-                    logo_element = job_card.find_element(By.CSS_SELECTOR, ".search-entity-media img")
-                    job_data["logo"] = logo_element.get_attribute("src") or "-"
-                except:
-                    pass
-                
-                # Extract title
-                try:
-                    title_element = job_card.find_element(By.CSS_SELECTOR, ".base-search-card__title")
-                    job_data["title"] = title_element.text.strip() or "-"
-                except:
-                    pass
-                
-                # Extract company
-                try:
-                    company_element = job_card.find_element(By.CSS_SELECTOR, ".base-search-card__subtitle a")
-                    job_data["company"] = company_element.text.strip() or "-"
-                except:
-                    pass
-                
-                # Extract location
-                try:
-                    location_element = job_card.find_element(By.CSS_SELECTOR, ".job-search-card__location")
-                    job_data["location"] = location_element.text.strip() or "-"
-                except:
-                    pass
-                
-                # Extract URL
-                try:
-                    url_element = job_card.find_element(By.CSS_SELECTOR, "a.base-card__full-link")
-                    job_data["url"] = url_element.get_attribute("href") or "-"
-                except:
-                    pass
-                
-                # For description, we'll use a placeholder since it's not visible in the list view
-                job_data["description"] = "Job description not available in list view"
-                
-                scraped_jobs.append(job_data)
-                print(f"  Title: {job_data['title']}")
-                print(f"  Company: {job_data['company']}")
-                print(f"  Location: {job_data['location']}")
-                
-            except Exception as e:
-                print(f"Error scraping job {i+1}: {e}")
-                continue
-        
-        # Save to JSON file
-        output_file = "linkedin_jobs_scraped.json"
-        metadata = {
-            "metadata": {
-                "total_jobs": len(scraped_jobs),
-                "scraped_at": datetime.now().isoformat(),
-                "source": "LinkedIn",
-                "location": "Casablanca, Morocco",
-                "keywords": "data"
-            },
-            "jobs": scraped_jobs
-        }
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
-        
-        print(f"\nScraping completed! Data saved to {output_file}")
-        print(f"Total jobs scraped: {len(scraped_jobs)}")
-        
-        # Insert into Supabase database if available
-        if supabase:
-            _insert_to_supabase(supabase, scraped_jobs)
-        else:
-            print("Skipping database insertion - Supabase not configured.")
-        
-        # Keep browser open for a moment to see results
-        print("Browser will close in 10 seconds...")
-        time.sleep(10)
-        driver.quit()
+        for i, raw_job in enumerate(raw_jobs):
+            # Start from the defaults and keep only the fields that were found
+            job_data = _JOB_TEMPLATE.copy()
+            job_data.update((field, value) for field, value in raw_job.items() if value)
+            
+            scraped_jobs.append(job_data)
+            log.debug("Scraped job %d/%d: %s | %s | %s", i + 1, len(raw_jobs), job_data["title"], job_data["company"], job_data["location"])
+        
+        log.info("Scraped %d jobs", len(scraped_jobs))
+        
+        # Save to JSON file and insert into Supabase concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            save_future = executor.submit(_save_to_json, scraped_jobs)
+            
+            # Insert into Supabase database if available
+            if supabase:
+                executor.submit(_insert_to_supabase, supabase, scraped_jobs).result()
+            else:
+                print("Skipping database insertion - Supabase not configured.")
+        
+        # Print the save summary only once the insert progress is done, so the two don't interleave
+        print(save_future.result())
         
     except Exception as e:
         print(f"Error occurred: {e}")
         print("Make sure you have Chrome browser installed on your system.")
 
 
+def _save_to_json(jobs: list, output_file: str = "linkedin_jobs_scraped.json") -> str:
+    """
+    Save the scraped jobs to a JSON file
+    
+    Returns:
+        A summary message for the caller to print, as this runs alongside the Supabase insert
+    """
+    metadata = {
+        "metadata": {
+            "total_jobs": len(jobs),
+            "scraped_at": datetime.now().isoformat(),
+            "source": "LinkedIn",
+            "location": "Casablanca, Morocco",
+            "keywords": "data"
+        },
+        "jobs": jobs
+    }
+    
+    with open(output_file, 'wb') as f:
+        f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+    
+    return (
+        f"\nScraping completed! Data saved to {output_file}\n"
+        f"Total jobs scraped: {len(jobs)}"
+    )
+
+
 def _insert_to_supabase(supabase: Client, jobs: list) -> None:
     """Insert the scraped jobs into Supabase internships table"""
     try:
@@ -187,28 +411,38 @@ def _insert_to_supabase(supabase: Client, jobs: list) -> None:
         print("Inserting LinkedIn jobs into Supabase...")
         print(f"{'='*80}")
         
-        # Insert jobs in batches of 50 to avoid payload size issues
-        batch_size = 50
+        # Insert jobs in batches of 500, sending up to 4 batches concurrently
+        batch_size = 500
+        batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
         total_inserted = 0
+        total_skipped = 0
         total_failed = 0
         
-        for i in range(0, len(jobs), batch_size):
-            batch = jobs[i:i + batch_size]
+        # Upsert each batch into Supabase, skipping jobs already stored
+        def upsert_batch(batch: list):
+            return supabase.table("internships").upsert(batch, on_conflict="title,company", ignore_duplicates=True).execute()
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(upsert_batch, batch) for batch in batches]
             
-            try:
-                # Insert batch into Supabase
-                response = supabase.table("internships").insert(batch).execute()
-                batch_inserted = len(batch)
-                total_inserted += batch_inserted
-                print(f"  ✓ Inserted batch {i//batch_size + 1}: {batch_inserted} jobs")
-                
-            except Exception as e:
-                total_failed += len(batch)
-                print(f"  ✗ Failed to insert batch {i//batch_size + 1}: {e}")
+            for batch_number, (batch, future) in enumerate(zip(batches, futures), 1):
+                try:
+                    response = future.result()
+                    # Only newly inserted rows are returned, duplicates are skipped silently
+                    batch_inserted = len(response.data or [])
+                    batch_skipped = len(batch) - batch_inserted
+                    total_inserted += batch_inserted
+                    total_skipped += batch_skipped
+                    print(f"  ✓ Upserted batch {batch_number}: {batch_inserted} inserted, {batch_skipped} already stored")
+                    
+                except Exception as e:
+                    total_failed += len(batch)
+                    print(f"  ✗ Failed to insert batch {batch_number}: {e}")
         
         print(f"\n{'='*80}")
         print(f"Supabase insertion complete!")
         print(f"  Total inserted: {total_inserted}")
+        print(f"  Total skipped (already stored): {total_skipped}")
         if total_failed > 0:
             print(f"  Total failed: {total_failed}")
         print(f"{'='*80}")
@@ -218,4 +452,6 @@ def _insert_to_supabase(supabase: Client, jobs: list) -> None:
 
 
 if __name__ == "__main__":
+    # Per-job details are logged at DEBUG level and hidden by default
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
     scrape_linkedin_jobs()
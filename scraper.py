@@ -5,12 +5,13 @@ targeting France and Morocco to get at least 100 listings
 """
 
 import os
-import time
-import json
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import httpx
+import orjson
+from selectolax.parser import HTMLParser
 from datetime import datetime
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional, Tuple
 from supabase import create_client, Client
 
 
@@ -44,6 +45,17 @@ class JobsScraper:
             }
         }
         
+        # Retry policy for transient RapidAPI failures
+        self.max_retries = 3
+        self.retry_backoff = 0.3
+        self.retry_statuses = {429, 500, 502, 503, 504}
+        self.max_retry_after = 60
+        
+        # Number of result pages fetched per source (and per JSearch query)
+        self.jsearch_pages = 3
+        self.active_jobs_db_pages = 2
+        self.active_jobs_db_page_size = 500
+        
         self.countries = ["France", "Morocco"]
         self.all_jobs = []
         
@@ -55,22 +67,36 @@ class JobsScraper:
         Returns:
             List of dictionaries containing job data
         """
+        return asyncio.run(self._run_async())
+    
+    async def _run_async(self) -> List[Dict]:
+        """Fetch all sources concurrently, then deduplicate, save and insert the jobs"""
         print("="*80)
         print("Starting Multi-Source Job Scraper for Data Internships")
         print("Search Terms: data internships, data scientist internships, software engineering internships, data engineering internships")
         print("Target: At least 100 listings")
         print("="*80 + "\n")
         
-        all_jobs = []
+        # One pooled HTTP/2 client shared by every RapidAPI request, so the
+        # requests to each host are multiplexed over a single connection
+        client = httpx.AsyncClient(
+            http2=True,
+            headers={"x-rapidapi-key": self.api_key},
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
         
-        # Fetch jobs from JSearch API
-        jsearch_jobs = self._fetch_jsearch_jobs()
-        all_jobs.extend(jsearch_jobs)
-        print(f"Total collected so far: {len(all_jobs)}")
+        # Rate limiting: cap the number of in-flight requests
+        semaphore = asyncio.Semaphore(4)
         
-        # Fetch jobs from Active Jobs DB API
-        active_jobs_db_jobs = self._fetch_active_jobs_db()
-        all_jobs.extend(active_jobs_db_jobs)
+        # Fetch jobs from JSearch and Active Jobs DB APIs concurrently
+        async with client:
+            jsearch_jobs, active_jobs_db_jobs = await asyncio.gather(
+                self._fetch_jsearch_jobs(client, semaphore),
+                self._fetch_active_jobs_db(client, semaphore)
+            )
+        
+        all_jobs = jsearch_jobs + active_jobs_db_jobs
         print(f"Total collected so far: {len(all_jobs)}")
         
         # Remove duplicates based on title + company
@@ -83,96 +109,166 @@ class JobsScraper:
         # Print results
         self._print_results(all_jobs)
         
-        # Save to JSON file
-        self._save_to_json(all_jobs)
+        # Save to JSON file and insert into Supabase concurrently
+        save_summary, _ = await asyncio.gather(
+            asyncio.to_thread(self._save_to_json, all_jobs),
+            asyncio.to_thread(self._insert_to_supabase, all_jobs)
+        )
         
-        # Insert into Supabase
-        self._insert_to_supabase(all_jobs)
+        # Print the save summary only once the insert progress is done, so the two don't interleave
+        print(save_summary)
         
         return all_jobs
     
-    def _fetch_jsearch_jobs(self) -> List[Dict]:
-        """Fetch jobs from JSearch API"""
-        print("\n[JSearch API] Fetching data internships...")
-        jobs = []
+    async def _get_api_json(self, client: httpx.AsyncClient, api: str, params: Dict) -> Tuple[int, Optional[Dict]]:
+        """
+        GET a RapidAPI endpoint, retrying transient failures with exponential backoff
         
-        # Query for data internships without country restriction
-        for query in ["data internships", "data scientist internships", "software engineering internships", "data engineering internships"]:
+        Returns:
+            The final HTTP status and the decoded JSON body (None unless the status is 200)
+        """
+        headers = {"x-rapidapi-host": self.apis[api]["host"]}
+        
+        for attempt in range(self.max_retries + 1):
+            delay = self.retry_backoff * 2 ** attempt
+            
             try:
-                params = {
-                    "query": query,
-                    "page": "1",
-                    "num_pages": "1",
-                    "date_posted": "all"
-                }
-                
-                headers = {
-                    "x-rapidapi-host": self.apis["jsearch"]["host"],
-                    "x-rapidapi-key": self.api_key
-                }
-                
-                response = requests.get(self.apis["jsearch"]["url"], headers=headers, params=params)
-                
+                response = await client.get(self.apis[api]["url"], headers=headers, params=params)
+            except httpx.TransportError:
+                # Connection errors, timeouts and protocol errors are retried too
+                if attempt == self.max_retries:
+                    raise
+            else:
                 if response.status_code == 200:
-                    data = response.json()
-                    api_jobs = data.get("data", [])
-                    
-                    for job in api_jobs:
-                        structured_job = self._parse_jsearch_job(job)
-                        if structured_job:
-                            jobs.append(structured_job)
-                    
-                    print(f"  ✓ Found {len(api_jobs)} jobs for '{query}'")
-                else:
-                    print(f"  ✗ Failed to fetch jobs for '{query}': Status {response.status_code}")
+                    return response.status_code, orjson.loads(response.content)
+                if response.status_code not in self.retry_statuses or attempt == self.max_retries:
+                    return response.status_code, None
                 
-                time.sleep(0.5)  # Rate limiting
+                # Honour the server's Retry-After (in seconds) when rate limited
+                if response.status_code == 429:
+                    try:
+                        delay = min(float(response.headers.get("Retry-After", delay)), self.max_retry_after)
+                    except ValueError:
+                        pass
+            
+            await asyncio.sleep(delay)
+    
+    async def _produce_pages(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, api: str, pages: List[Dict], extract: Callable[[Dict], List[Dict]], queue: asyncio.Queue) -> None:
+        """
+        Fetch result pages one after another and queue them for parsing, so the
+        next page is already downloading while the previous one is parsed
+        
+        Queues (page number, status, raw jobs) tuples, with raw jobs set to None
+        on failure, and a final None once there are no more pages.
+        """
+        try:
+            for page_number, params in enumerate(pages, 1):
+                async with semaphore:
+                    status, data = await self._get_api_json(client, api, params)
+                api_jobs = extract(data) if data is not None else None
+                await queue.put((page_number, status, api_jobs))
                 
-            except Exception as e:
-                print(f"  ✗ Error fetching jobs for '{query}': {e}")
+                # Stop at the first failed or empty page
+                if not api_jobs:
+                    break
+        finally:
+            await queue.put(None)
+    
+    async def _fetch_jsearch_jobs(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore) -> List[Dict]:
+        """Fetch jobs from JSearch API, running all queries concurrently"""
+        print("\n[JSearch API] Fetching data internships...")
+        
+        # Query for data internships without country restriction
+        tasks = [
+            asyncio.create_task(self._fetch_jsearch_query(client, semaphore, query))
+            for query in ["data internships", "data scientist internships", "software engineering internships", "data engineering internships"]
+        ]
+        results = await asyncio.gather(*tasks)
+        jobs = [job for query_jobs in results for job in query_jobs]
         
         print(f"[JSearch API] Total collected: {len(jobs)}")
         return jobs
     
-    def _fetch_active_jobs_db(self) -> List[Dict]:
-        """Fetch jobs from Active Jobs DB API"""
-        print("\n[Active Jobs DB API] Fetching data internships...")
+    async def _consume_pages(self, queue: asyncio.Queue, producer: asyncio.Task, parse: Callable[[Dict], Optional[Dict]], label: str) -> List[Dict]:
+        """
+        Parse the pages queued by _produce_pages() as they arrive
+        
+        Returns:
+            The parsed jobs, including those from pages fetched before any error
+        """
+        loop = asyncio.get_running_loop()
         jobs = []
         
         try:
-            params = {
-                "limit": "500",
-                "offset": "0",
-                "description_type": "text"
-            }
-            
-            headers = {
-                "x-rapidapi-host": self.apis["active_jobs_db"]["host"],
-                "x-rapidapi-key": self.api_key
-            }
-            
-            response = requests.get(self.apis["active_jobs_db"]["url"], headers=headers, params=params)
-            
-            if response.status_code == 200:
-                data = response.json()
-                api_jobs = data.get("data", []) or data.get("jobs", []) or []
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
                 
-                for job in api_jobs:
-                    structured_job = self._parse_active_jobs_db_job(job)
-                    if structured_job:
-                        jobs.append(structured_job)
+                page_number, status, api_jobs = item
+                if api_jobs is None:
+                    print(f"  ✗ Failed to fetch jobs {label} (page {page_number}): Status {status}")
+                    continue
                 
-                print(f"  ✓ Found {len(api_jobs)} jobs from Active Jobs DB")
-            else:
-                print(f"  ✗ Failed to fetch jobs from Active Jobs DB: Status {response.status_code}")
+                # Parse off the event loop so it keeps serving network I/O
+                jobs.extend(await loop.run_in_executor(None, self._parse_jobs, parse, api_jobs))
+                
+                print(f"  ✓ Found {len(api_jobs)} jobs {label} (page {page_number})")
+            
+            # Surface any error raised while fetching
+            await producer
             
         except Exception as e:
-            print(f"  ✗ Error fetching Active Jobs DB jobs: {e}")
+            producer.cancel()
+            print(f"  ✗ Error fetching jobs {label}: {e}")
+        
+        return jobs
+    
+    async def _fetch_jsearch_query(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, query: str) -> List[Dict]:
+        """Fetch jobs from JSearch API for a single query, page by page"""
+        pages = [
+            {
+                "query": query,
+                "page": str(page),
+                "num_pages": "1",
+                "date_posted": "all"
+            }
+            for page in range(1, self.jsearch_pages + 1)
+        ]
+        
+        queue = asyncio.Queue(maxsize=2)
+        producer = asyncio.create_task(self._produce_pages(
+            client, semaphore, "jsearch", pages, lambda data: data.get("data", []), queue
+        ))
+        return await self._consume_pages(queue, producer, self._parse_jsearch_job, f"for '{query}'")
+    
+    async def _fetch_active_jobs_db(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore) -> List[Dict]:
+        """Fetch jobs from Active Jobs DB API, page by page"""
+        print("\n[Active Jobs DB API] Fetching data internships...")
+        
+        pages = [
+            {
+                "limit": str(self.active_jobs_db_page_size),
+                "offset": str(page * self.active_jobs_db_page_size),
+                "description_type": "text"
+            }
+            for page in range(self.active_jobs_db_pages)
+        ]
+        
+        queue = asyncio.Queue(maxsize=2)
+        producer = asyncio.create_task(self._produce_pages(
+            client, semaphore, "active_jobs_db", pages, lambda data: data.get("data", []) or data.get("jobs", []) or [], queue
+        ))
+        jobs = await self._consume_pages(queue, producer, self._parse_active_jobs_db_job, "from Active Jobs DB")
         
         print(f"[Active Jobs DB API] Total collected: {len(jobs)}")
         return jobs
     
     
+    def _parse_jobs(self, parse: Callable[[Dict], Optional[Dict]], api_jobs: List[Dict]) -> List[Dict]:
+        """Parse a page of raw API jobs, dropping the ones that fail to parse"""
+        return [structured_job for structured_job in map(parse, api_jobs) if structured_job]
+    
     def _parse_jsearch_job(self, job_data: Dict) -> Optional[Dict]:
         """Parse job data from JSearch API"""
         try:
@@ -185,10 +281,9 @@ class JobsScraper:
             # Extract job description
             description = job_data.get("job_description", None)
             
-            # If description is HTML, clean it with BeautifulSoup
+            # If description is HTML, clean it with selectolax
             if description and "<" in description:
-                soup = BeautifulSoup(description, 'html.parser')
-                description = soup.get_text(strip=True)
+                description = HTMLParser(description).text(strip=True)
             
             # Extract company name
             company = job_data.get("employer_name", None)
@@ -224,8 +319,7 @@ class JobsScraper:
         try:
             description = job_data.get("description", None)
             if description and "<" in description:
-                soup = BeautifulSoup(description, 'html.parser')
-                description = soup.get_text(strip=True)
+                description = HTMLParser(description).text(strip=True)
             
             return {
                 "logo": job_data.get("logo", None) or job_data.get("company_logo", None),
@@ -242,17 +336,16 @@ class JobsScraper:
     
     def _remove_duplicates(self, jobs: List[Dict]) -> List[Dict]:
         """Remove duplicate jobs based on title + company"""
-        seen = set()
-        unique_jobs = []
+        deduped = {}
         
         for job in jobs:
             # Create a unique key from title and company
-            key = f"{job.get('title', '').lower()}_{job.get('company', '').lower()}"
+            key = (job.get('title') or '').casefold(), (job.get('company') or '').casefold()
             
-            if key not in seen and key != "_":  # Ensure both title and company exist
-                seen.add(key)
-                unique_jobs.append(job)
+            if all(key):  # Ensure both title and company exist
+                deduped.setdefault(key, job)
         
+        unique_jobs = list(deduped.values())
         print(f"\nRemoved {len(jobs) - len(unique_jobs)} duplicate jobs")
         return unique_jobs
     
@@ -289,8 +382,13 @@ class JobsScraper:
         print(f"Total unique jobs scraped: {len(jobs)}")
         print(f"{'='*80}")
     
-    def _save_to_json(self, jobs: List[Dict], filename: str = "linkedin_jobs.json") -> None:
-        """Save the scraped jobs to a JSON file"""
+    def _save_to_json(self, jobs: List[Dict], filename: str = "linkedin_jobs.json") -> str:
+        """
+        Save the scraped jobs to a JSON file
+        
+        Returns:
+            A summary message for the caller to print, as this runs alongside the Supabase insert
+        """
         try:
             # Prepare metadata
             output = {
@@ -303,15 +401,17 @@ class JobsScraper:
                 "jobs": jobs
             }
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(output, f, indent=2, ensure_ascii=False)
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(output, option=orjson.OPT_INDENT_2))
             
-            print(f"\n✓ Results saved to {filename}")
-            print(f"  Total jobs: {len(jobs)}")
-            print(f"  File size: {os.path.getsize(filename) / 1024:.2f} KB")
+            return (
+                f"\n✓ Results saved to {filename}\n"
+                f"  Total jobs: {len(jobs)}\n"
+                f"  File size: {os.path.getsize(filename) / 1024:.2f} KB"
+            )
             
         except Exception as e:
-            print(f"✗ Error saving to JSON: {e}")
+            return f"✗ Error saving to JSON: {e}"
     
     def _insert_to_supabase(self, jobs: List[Dict]) -> None:
         """Insert the scraped jobs into Supabase internships table"""
@@ -320,28 +420,38 @@ class JobsScraper:
             print("Inserting jobs into Supabase...")
             print(f"{'='*80}")
             
-            # Insert jobs in batches of 100 to avoid payload size issues
-            batch_size = 100
+            # Insert jobs in batches of 500, sending up to 4 batches concurrently
+            batch_size = 500
+            batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
             total_inserted = 0
+            total_skipped = 0
             total_failed = 0
             
-            for i in range(0, len(jobs), batch_size):
-                batch = jobs[i:i + batch_size]
+            # Upsert each batch into Supabase, skipping jobs already stored
+            def upsert_batch(batch: List[Dict]):
+                return self.supabase.table("internships").upsert(batch, on_conflict="title,company", ignore_duplicates=True).execute()
+            
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [executor.submit(upsert_batch, batch) for batch in batches]
                 
-                try:
-                    # Insert batch into Supabase
-                    response = self.supabase.table("internships").insert(batch).execute()
-                    batch_inserted = len(batch)
-                    total_inserted += batch_inserted
-                    print(f"  ✓ Inserted batch {i//batch_size + 1}: {batch_inserted} jobs")
-                    
-                except Exception as e:
-                    total_failed += len(batch)
-                    print(f"  ✗ Failed to insert batch {i//batch_size + 1}: {e}")
+                for batch_number, (batch, future) in enumerate(zip(batches, futures), 1):
+                    try:
+                        response = future.result()
+                        # Only newly inserted rows are returned, duplicates are skipped silently
+                        batch_inserted = len(response.data or [])
+                        batch_skipped = len(batch) - batch_inserted
+                        total_inserted += batch_inserted
+                        total_skipped += batch_skipped
+                        print(f"  ✓ Upserted batch {batch_number}: {batch_inserted} inserted, {batch_skipped} already stored")
+                        
+                    except Exception as e:
+                        total_failed += len(batch)
+                        print(f"  ✗ Failed to insert batch {batch_number}: {e}")
             
             print(f"\n{'='*80}")
             print(f"Supabase insertion complete!")
             print(f"  Total inserted: {total_inserted}")
+            print(f"  Total skipped (already stored): {total_skipped}")
             if total_failed > 0:
                 print(f"  Total failed: {total_failed}")
             print(f"{'='*80}")
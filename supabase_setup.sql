@@ -1,5 +1,7 @@
 -- Supabase Table Setup for Multi-Source Internship Scraper
--- Run this SQL in your Supabase SQL Editor to create the internships table
+-- Run this SQL in your Supabase SQL Editor to create the internships table.
+-- It is safe to re-run on an existing table: every statement is idempotent, so the
+-- migration steps below are not rolled back by an "already exists" error.
 
 -- Create internships table
 CREATE TABLE IF NOT EXISTS internships (
@@ -9,13 +11,31 @@ CREATE TABLE IF NOT EXISTS internships (
   description TEXT,
   company TEXT NOT NULL,
   location TEXT,
-  url TEXT UNIQUE,
+  url TEXT,
   created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
--- Add index for faster duplicate checking by URL
+-- Jobs are deduplicated on (title, company), not URL: the same posting can be
+-- listed under several URLs and LinkedIn cards without a link default to "-".
+-- Drop the URL uniqueness left by earlier versions of this script so a known
+-- URL under a different title or company cannot fail a whole upsert batch.
+ALTER TABLE internships DROP CONSTRAINT IF EXISTS internships_url_key;
+
+-- Add index for faster lookups by URL
 CREATE INDEX IF NOT EXISTS idx_internships_url ON internships(url);
 
+-- Remove duplicate (title, company) rows left by earlier insert-only runs,
+-- keeping the oldest, so the unique index below can be created
+DELETE FROM internships a
+  USING internships b
+  WHERE a.title = b.title
+    AND a.company = b.company
+    AND a.id > b.id;
+
+-- Unique (title, company) pair so inserts can upsert with on_conflict="title,company"
+-- and skip jobs already stored by a previous run
+CREATE UNIQUE INDEX IF NOT EXISTS idx_internships_title_company ON internships(title, company);
+
 -- Add index for searching by company
 CREATE INDEX IF NOT EXISTS idx_internships_company ON internships(company);
 
@@ -26,6 +46,7 @@ CREATE INDEX IF NOT EXISTS idx_internships_created_at ON internships(created_at
 ALTER TABLE internships ENABLE ROW LEVEL SECURITY;
 
 -- Optional: Create a policy to allow authenticated users to read all internships
+DROP POLICY IF EXISTS "Allow authenticated users to read internships" ON internships;
 CREATE POLICY "Allow authenticated users to read internships"
   ON internships
   FOR SELECT
@@ -33,6 +54,7 @@ CREATE POLICY "Allow authenticated users to read internships"
   USING (true);
 
 -- Optional: Create a policy to allow service role to insert/update/delete
+DROP POLICY IF EXISTS "Allow service role full access to internships" ON internships;
 CREATE POLICY "Allow service role full access to internships"
   ON internships
   FOR ALL